@@ -1,26 +1,27 @@
-import pandas as pd
-import os
+import pyarrow.csv as pacsv
+import pyarrow.parquet as pq
 
 # Define file paths
 input_file = 'd:/Clase-fundamentos-aprendizaje-automatico/WeatherChart/data/charts.csv'
-output_file = 'd:/Clase-fundamentos-aprendizaje-automatico/WeatherChart/data/charts_cleaned.csv'
+output_file = 'd:/Clase-fundamentos-aprendizaje-automatico/WeatherChart/data/charts_cleaned.parquet'
 
 # Define columns to keep
 columns_to_keep = ['title', 'date', 'artist', 'region']
 
-# Process in chunks to handle large file size
-chunk_size = 100000
-chunks = pd.read_csv(input_file, usecols=columns_to_keep, chunksize=chunk_size)
+# Stream the file in large blocks; only the kept columns are decoded
+block_size = 64 << 20
+reader = pacsv.open_csv(
+    input_file,
+    read_options=pacsv.ReadOptions(block_size=block_size),
+    convert_options=pacsv.ConvertOptions(include_columns=columns_to_keep),
+)
 
 try:
-    first_chunk = True
-    for chunk in chunks:
-        # Write to CSV
-        mode = 'w' if first_chunk else 'a'
-        header = first_chunk
-        chunk.to_csv(output_file, index=False, mode=mode, header=header)
-        first_chunk = False
-        print(".", end="", flush=True) # Progress indicator
+    # Single Parquet file (columnar + zstd, dictionary-encodes artist/region)
+    with pq.ParquetWriter(output_file, reader.schema, compression='zstd') as writer:
+        for batch in reader:
+            writer.write_batch(batch)
+            print(".", end="", flush=True) # Progress indicator
     print("\nFiltering complete. Saved to", output_file)
 except Exception as e:
     print(f"\nError processing file: {e}")
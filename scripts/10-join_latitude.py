@@ -1,7 +1,7 @@
 """
 10-join_latitude.py
-Joins the main dataset (final_dataset_v3.csv) with geographic/socioeconomic data
-(country_latitude.csv) to produce final_dataset_v4.csv.
+Joins the main dataset (final_dataset_v3.parquet) with geographic/socioeconomic data
+(country_latitude.csv) to produce final_dataset_v4.parquet.
 
 Join strategy:
   - Normalize country names (lowercase, strip) for matching.
@@ -9,15 +9,21 @@ Join strategy:
   - Report matched/unmatched regions.
 """
 import pandas as pd
+import numpy as np
+import pyarrow as pa
+import pyarrow.compute as pc
+import pyarrow.dataset as ds
+import pyarrow.parquet as pq
 
 # File paths
-main_dataset_file = 'd:/Clase-fundamentos-aprendizaje-automatico/WeatherChart/data/final_dataset_v3.csv'
+main_dataset_file = 'd:/Clase-fundamentos-aprendizaje-automatico/WeatherChart/data/final_dataset_v3.parquet'
 latitude_file = 'd:/Clase-fundamentos-aprendizaje-automatico/WeatherChart/data/country_latitude.csv'
-output_file = 'd:/Clase-fundamentos-aprendizaje-automatico/WeatherChart/data/final_dataset_v4.csv'
+output_file = 'd:/Clase-fundamentos-aprendizaje-automatico/WeatherChart/data/final_dataset_v4.parquet'
 
 # --- Load latitude data ---
 print("Loading latitude data...")
-df_lat = pd.read_csv(latitude_file)
+lat_dtypes = {c: 'float32' for c in ['latitude', 'longitude', 'tertiary_enrollment', 'unemployment_rate']}
+df_lat = pd.read_csv(latitude_file, dtype=lat_dtypes)
 print(f"Latitude data shape: {df_lat.shape}")
 
 # Normalization helper
@@ -30,14 +36,16 @@ print(f"Unique latitude countries: {len(lat_country_map)}")
 
 # --- Discover regions in main dataset ---
 print("Loading unique regions from main dataset...")
-unique_regions = pd.read_csv(main_dataset_file, usecols=['region'])['region'].unique()
+# Stream only the region column and fold each batch's (dictionary) values
+# into a set: O(unique) memory instead of materializing every row
+seen_regions = set()
+region_reader = pq.ParquetFile(main_dataset_file, read_dictionary=['region']).iter_batches(columns=['region'])
+for region_batch in region_reader:
+    seen_regions.update(region_batch.column('region').dictionary.to_pylist())
+unique_regions = np.array(sorted(r for r in seen_regions if r is not None), dtype=object)
 print(f"Unique regions: {len(unique_regions)}")
 
 # --- Build region -> latitude_country mapping ---
-region_map = {}
-matched = 0
-unmatched_list = []
-
 # Potential overrides if needed (can copy from join_climate if useful)
 overrides = {
     'usa': 'United States',
@@ -56,27 +64,20 @@ overrides = {
 # Actually 'latitude.csv' had "Russian Federation" usually or similar.
 # Let's rely on normalization first.
 
-for region in unique_regions:
-    norm = normalize_name(region)
-    
-    # Check map directly
-    if norm in lat_country_map:
-        region_map[region] = lat_country_map[norm]
-        matched += 1
-        continue
-        
-    # Check overrides
-    found_override = False
-    if norm in overrides:
-        target_norm = normalize_name(overrides[norm])
-        if target_norm in lat_country_map:
-            region_map[region] = lat_country_map[target_norm]
-            matched += 1
-            found_override = True
-    
-    if not found_override:
-        region_map[region] = None
-        unmatched_list.append(region)
+# Normalize override targets once so they can be looked up directly
+overrides_norm = {k: normalize_name(v) for k, v in overrides.items()}
+lat_map_s = pd.Series(lat_country_map)
+
+# Vectorized matching: direct normalized match first, then overrides
+regions_s = pd.Series(unique_regions)
+norm = regions_s.astype(str).str.lower().str.strip()
+primary = norm.map(lat_map_s)
+fallback = norm.map(overrides_norm).map(lat_map_s)
+matched_s = primary.combine_first(fallback)
+
+region_map = {r: (c if pd.notna(c) else None) for r, c in zip(regions_s, matched_s)}
+matched = int(matched_s.notna().sum())
+unmatched_list = regions_s[matched_s.isna()].tolist()
 
 print(f"Matched regions: {matched}/{len(unique_regions)}")
 if unmatched_list:
@@ -88,31 +89,67 @@ mapping_df = pd.DataFrame(list(region_map.items()), columns=['region', 'join_cou
 # Rename latitude country column for join
 df_lat = df_lat.rename(columns={'country': 'join_country'})
 
+# Collapse region -> join_country -> latitude columns into one small lookup
+# indexed by region, so each chunk needs a single indexed join
+lookup = (
+    mapping_df.merge(df_lat, on='join_country', how='left')
+    .drop(columns=['join_country'])
+    .drop_duplicates('region')
+    .set_index('region')
+)
+
+# Arrow copy of the lookup: the join runs on Arrow batches, so the per-batch
+# work stays in C++ (no GIL) and overlaps with the threaded Parquet scanner
+lookup_table = pa.Table.from_pandas(lookup.reset_index(), preserve_index=False)
+lookup_keys = lookup_table['region'].cast(pa.string())
+lookup_cols = [c for c in lookup_table.column_names if c != 'region']
+
 # --- Process in chunks ---
 print("Joining latitude data...")
-chunk_size = 500000
-first_chunk = True
+batch_size = 500000
+writer = None
+
+# Explicit column types for the output: each batch is cast to this schema,
+# so v4 keeps compact types whatever the upstream writers produced.
+# Low-cardinality strings are dictionary-encoded (pandas category), so
+# the region probe hashes each distinct value once instead of once per row
+category_cols = ['region', 'track_genre', 'continent']
+string_cols = ['title', 'date', 'artist']
+float_cols = [
+    'danceability', 'energy', 'key', 'loudness', 'speechiness', 'acousticness',
+    'instrumentalness', 'liveness', 'valence', 'tempo',
+    'avg_temp', 'population', 'gdp_per_capita',
+]
+column_types = {c: pa.dictionary(pa.int32(), pa.string()) for c in category_cols}
+column_types.update({c: pa.string() for c in string_cols})
+column_types.update({c: pa.float32() for c in float_cols})
+column_types['month'] = pa.int8()
 
 try:
-    chunks = pd.read_csv(main_dataset_file, chunksize=chunk_size)
-    for chunk in chunks:
-        # Add join_country via mapping
-        chunk = pd.merge(chunk, mapping_df, on='region', how='left')
-        
-        # Join with latitude data
-        chunk_merged = pd.merge(chunk, df_lat, on='join_country', how='left')
+    dataset = ds.dataset(main_dataset_file, format='parquet')
+    target_schema = pa.schema([pa.field(f.name, column_types.get(f.name, f.type)) for f in dataset.schema])
+    # Batches are decoded on Arrow's thread pool with readahead, so decoding
+    # of upcoming batches runs on other cores while the current one is joined
+    for batch in dataset.to_batches(batch_size=batch_size, use_threads=True):
+        table = pa.Table.from_batches([batch]).cast(target_schema)
         
-        # Drop join helper column
-        chunk_merged = chunk_merged.drop(columns=['join_country'])
+        # Join with latitude data: probe the region dictionary once, then
+        # gather every lookup column with the same indices (unmatched -> null)
+        region = table.column('region').combine_chunks()
+        idx = pc.index_in(region.dictionary, value_set=lookup_keys).take(region.indices)
+        for col in lookup_cols:
+            table = table.append_column(col, lookup_table[col].take(idx))
         
-        # Save
-        mode = 'w' if first_chunk else 'a'
-        header = first_chunk
-        chunk_merged.to_csv(output_file, index=False, mode=mode, header=header)
-        first_chunk = False
+        # Save (single Parquet writer, schema fixed by the first batch)
+        if writer is None:
+            writer = pq.ParquetWriter(output_file, table.schema, compression='zstd')
+        writer.write_table(table.cast(writer.schema))
         print(".", end="", flush=True)
 
     print(f"\nJoin complete. Saved to {output_file}")
 
 except Exception as e:
     print(f"Error joining latitude data: {e}")
+finally:
+    if writer is not None:
+        writer.close()
@@ -1,60 +1,84 @@
 import pandas as pd
+import pyarrow.compute as pc
+from collections import Counter
+import pyarrow.dataset as ds
+import pyarrow.parquet as pq
 import os
 
 # File paths
-input_file = 'd:/Clase-fundamentos-aprendizaje-automatico/WeatherChart/data/final_dataset_v4.csv'
-output_file = 'd:/Clase-fundamentos-aprendizaje-automatico/WeatherChart/data/train_dataset.csv'
+input_file = 'd:/Clase-fundamentos-aprendizaje-automatico/WeatherChart/data/final_dataset_v4.parquet'
+output_file = 'd:/Clase-fundamentos-aprendizaje-automatico/WeatherChart/data/train_dataset.parquet'
 
 if not os.path.exists(input_file):
     print(f"Error: {input_file} not found. Ensure 10-join_latitude.py completed successfully.")
     exit(1)
 
-print("Loading final_dataset_v4.csv...")
-# Load in chunks to filter
-chunk_size = 500000
-first_chunk = True
+print("Loading final_dataset_v4.parquet...")
+# Stream in batches to filter
+batch_size = 500000
+writer = None
 total_rows = 0
 filtered_rows = 0
+country_counter = Counter()
 
 try:
-    chunks = pd.read_csv(input_file, chunksize=chunk_size)
+    dataset = ds.dataset(input_file, format='parquet')
+    total_rows = dataset.count_rows()
     
-    for chunk in chunks:
-        # Filter 1: Genres must not be null (implicit in join logic but safe to keep)
-        # Filter 2: Temperature must not be null
-        # Filter 3: Latitude/Unemployment must not be null (new)
-        
-        # Combined filter: check critical columns
-        # unemployment_rate comes from the latitude join, so if it's there, likely others are too.
-        chunk_clean = chunk.dropna(subset=['track_genre', 'avg_temp', 'unemployment_rate'])
-        
-        if not chunk_clean.empty:
-            mode = 'w' if first_chunk else 'a'
-            header = first_chunk
-            chunk_clean.to_csv(output_file, index=False, mode=mode, header=header)
-            first_chunk = False
-            filtered_rows += len(chunk_clean)
+    # Filter 1: Genres must not be null (implicit in join logic but safe to keep)
+    # Filter 2: Temperature must not be null
+    # Filter 3: Latitude/Unemployment must not be null (new)
+    
+    # Combined filter: check critical columns
+    # unemployment_rate comes from the latitude join, so if it's there, likely others are too.
+    # The filter is pushed into the scanner, which evaluates it in parallel on
+    # Arrow's thread pool instead of a single-threaded pandas dropna.
+    not_null = None
+    for col in ['track_genre', 'avg_temp', 'unemployment_rate']:
+        cond = ~ds.field(col).is_null(nan_is_null=True)
+        not_null = cond if not_null is None else not_null & cond
+    
+    for batch in dataset.to_batches(filter=not_null, batch_size=batch_size, use_threads=True):
+        if batch.num_rows > 0:
+            if writer is None:
+                writer = pq.ParquetWriter(output_file, batch.schema, compression='zstd')
+            writer.write_batch(batch)
+            filtered_rows += batch.num_rows
+            
+            # Track the country distribution while writing (no re-read later)
+            region_counts = pc.value_counts(batch.column('region'))
+            country_counter.update(dict(zip(
+                region_counts.field('values').to_pylist(),
+                region_counts.field('counts').to_pylist(),
+            )))
             
-        total_rows += len(chunk)
         print(".", end="", flush=True)
+    
+    # Close the single writer here so the footer is written before validation
+    if writer is not None:
+        writer.close()
         
     print(f"\nProcessing complete.")
     print(f"Original rows: {total_rows}")
     print(f"Training set rows: {filtered_rows}")
     print(f"Retention rate: {filtered_rows/total_rows*100:.2f}%")
     
-    # Validation step: Load the training set to check country distribution
+    # Validation step: country distribution accumulated during the write loop
     print("\nValidating training set distribution...")
-    if os.path.exists(output_file):
-        df_train = pd.read_csv(output_file, usecols=['region'])
-        country_counts = df_train['region'].value_counts()
+    if writer is not None:
+        country_counts = pd.Series(country_counter, name='count').sort_values(ascending=False)
+        country_counts.index.name = 'region'
         print(f"Number of countries in training set: {len(country_counts)}")
         print("Top 10 countries by row count:")
         print(country_counts.head(10))
         print("Bottom 5 countries by row count:")
         print(country_counts.tail(5))
     else:
-        print("Error: train_dataset.csv was not created (empty result?).")
+        print("Error: train_dataset.parquet was not created (empty result?).")
 
 except Exception as e:
     print(f"Error creating training set: {e}")
+finally:
+    # No-op if already closed; on error it still finalizes the Parquet footer
+    if writer is not None:
+        writer.close()
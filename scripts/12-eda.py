@@ -2,118 +2,96 @@
 12-eda.py
 Performs Exploratory Data Analysis (EDA) on the training dataset.
 Generates professional statistical summaries and high-quality visualizations.
+
+Each figure is rendered in its own worker process (matplotlib is not
+thread-safe); heavy aggregations are computed once in the main process and
+only the small plot inputs are sent to the workers.
 """
 import pandas as pd
+import matplotlib
+matplotlib.use('Agg')  # Non-interactive backend (required in worker processes)
 import matplotlib.pyplot as plt
 import seaborn as sns
 import numpy as np
+import pyarrow.dataset as ds
+import io
+import sys
 import os
+from concurrent.futures import ProcessPoolExecutor
 
 # Settings
-input_file = 'd:/Clase-fundamentos-aprendizaje-automatico/WeatherChart/data/train_dataset.csv'
+input_file = 'd:/Clase-fundamentos-aprendizaje-automatico/WeatherChart/data/train_dataset.parquet'
 output_dir = 'd:/Clase-fundamentos-aprendizaje-automatico/WeatherChart/plots/'
 report_file = 'd:/Clase-fundamentos-aprendizaje-automatico/WeatherChart/data/eda_report_professional.txt'
 
-# Ensure output directory exists
-os.makedirs(output_dir, exist_ok=True)
-
-# Set professional aesthetic
+# Set professional aesthetic (module level so every worker process applies it)
 sns.set_theme(style="whitegrid", context="paper", font_scale=1.2)
 palette = sns.color_palette("viridis")
 
-# 1. Load Data (Sample if large)
-print("Loading data sample (1M rows)...")
-try:
-    # Read a sample for visualization to manage memory
-    df = pd.read_csv(input_file, nrows=1000000)
-    print(f"Loaded {len(df)} rows.")
-except Exception as e:
-    print(f"Error loading data: {e}")
-    exit(1)
-
-import io
-
-# 2. Statistical Summary
-print("Generating comprehensive statistical summary...")
-with open(report_file, 'w', encoding='utf-8') as f:
-    f.write("Professional EDA Report\n")
-    f.write("=======================\n\n")
-    f.write(f"Shape of sample: {df.shape}\n\n")
-    
-    f.write("--- Data Types & Missing Values ---\n")
-    buffer = io.StringIO()
-    df.info(buf=buffer)
-    f.write(buffer.getvalue() + "\n\n")
-    
-    f.write(f"Total Missing Values:\n{df.isnull().sum()}\n\n")
-    
-    f.write("--- Numerical Statistics ---\n")
-    f.write(str(df.describe().T) + "\n\n")
-    
-    f.write("--- Categorical Statistics ---\n")
-    f.write(str(df.describe(include=['O']).T) + "\n\n")
-    
-    f.write("--- Top 20 Countries (by Data Volume) ---\n")
-    f.write(str(df['region'].value_counts().head(20)) + "\n\n")
-    
-    f.write("--- Top 20 Genres ---\n")
-    f.write(str(df['track_genre'].value_counts().head(20)) + "\n\n")
-
-print(f"Report saved to {report_file}")
-
-# 3. Visualizations
-print("Generating professional plots...")
-
 # Feature Groups
-audio_feats = ['danceability', 'energy', 'loudness', 'speechiness', 'acousticness', 
+audio_feats = ['danceability', 'energy', 'loudness', 'speechiness', 'acousticness',
                'instrumentalness', 'liveness', 'valence', 'tempo']
-socio_feats = ['avg_temp', 'population', 'gdp_per_capita', 'tertiary_enrollment', 
+socio_feats = ['avg_temp', 'population', 'gdp_per_capita', 'tertiary_enrollment',
                'unemployment_rate']
 geo_feats = ['latitude', 'longitude']
 
+# Plot sample: distributions drawn from 50k points are visually identical to
+# 1M, and matplotlib no longer builds a path per overplotted point.
+# The full sample is kept for the report, correlations and value counts.
+plot_sample_size = 50_000
+
+
 # A. Advanced Histograms & KDE for Audio Features
-print("Plotting distributions...")
-plt.figure(figsize=(20, 15))
-for i, col in enumerate(audio_feats):
-    plt.subplot(3, 3, i+1)
-    sns.histplot(df[col], kde=True, bins=30, color=palette[i % len(palette)], edgecolor='black', alpha=0.7)
-    plt.title(f'Distribution of {col}', fontweight='bold')
-    plt.xlabel(col)
-    plt.ylabel('Density')
-plt.tight_layout()
-plt.savefig(f"{output_dir}/dist_audio_features.png", dpi=300)
-plt.close()
+def plot_distributions(df_plot):
+    print("Plotting distributions...")
+    plt.figure(figsize=(20, 15))
+    for i, col in enumerate(audio_feats):
+        plt.subplot(3, 3, i+1)
+        sns.histplot(df_plot[col], kde=True, bins=30, color=palette[i % len(palette)], edgecolor='black', alpha=0.7)
+        plt.title(f'Distribution of {col}', fontweight='bold')
+        plt.xlabel(col)
+        plt.ylabel('Density')
+    plt.tight_layout()
+    plt.savefig(f"{output_dir}/dist_audio_features.png", dpi=300)
+    plt.close()
+
 
 # B. Boxplots for Outlier Detection (Normalized for view)
-print("Plotting boxplots...")
-plt.figure(figsize=(16, 8))
-# Normalize audio features for side-by-side comparison (min-max scaling just for plot)
-df_norm = (df[audio_feats] - df[audio_feats].min()) / (df[audio_feats].max() - df[audio_feats].min())
-sns.boxplot(data=df_norm, palette="viridis")
-plt.title('Audio Features Boxplots (Normalized)', fontweight='bold')
-plt.xticks(rotation=45)
-plt.savefig(f"{output_dir}/boxplot_audio_features.png", dpi=300)
-plt.close()
+def plot_boxplots(df_plot):
+    print("Plotting boxplots...")
+    plt.figure(figsize=(16, 8))
+    # Normalize audio features for side-by-side comparison (min-max scaling just for plot)
+    audio_arr = df_plot[audio_feats].to_numpy()
+    audio_min = audio_arr.min(axis=0)
+    audio_range = audio_arr.max(axis=0) - audio_min
+    df_norm = pd.DataFrame((audio_arr - audio_min) / audio_range, columns=audio_feats)
+    sns.boxplot(data=df_norm, palette="viridis")
+    plt.title('Audio Features Boxplots (Normalized)', fontweight='bold')
+    plt.xticks(rotation=45)
+    plt.savefig(f"{output_dir}/boxplot_audio_features.png", dpi=300)
+    plt.close()
+
 
 # C. Correlation Heatmap (Enhanced)
-print("Plotting correlation matrix...")
-plt.figure(figsize=(16, 14))
-numeric_df = df.select_dtypes(include=['float64', 'int64'])
-corr = numeric_df.corr()
-mask = np.triu(np.ones_like(corr, dtype=bool))
-sns.heatmap(corr, mask=mask, annot=True, fmt=".2f", cmap='coolwarm', vmin=-1, vmax=1, 
-            linewidths=0.5, square=True, cbar_kws={"shrink": .8})
-plt.title('Feature Correlation Matrix', fontweight='bold', fontsize=16)
-plt.savefig(f"{output_dir}/correlation_matrix_professional.png", dpi=300)
-plt.close()
+def plot_correlation(corr):
+    print("Plotting correlation matrix...")
+    plt.figure(figsize=(16, 14))
+    mask = np.triu(np.ones_like(corr, dtype=bool))
+    sns.heatmap(corr, mask=mask, annot=True, fmt=".2f", cmap='coolwarm', vmin=-1, vmax=1,
+                linewidths=0.5, square=True, cbar_kws={"shrink": .8})
+    plt.title('Feature Correlation Matrix', fontweight='bold', fontsize=16)
+    plt.savefig(f"{output_dir}/correlation_matrix_professional.png", dpi=300)
+    plt.close()
+
 
 # D. Geospatial Distribution (Colored by Temp)
-if 'latitude' in df.columns and 'longitude' in df.columns:
+def plot_geo(df_geo):
     print("Plotting geospatial map...")
     plt.figure(figsize=(16, 10))
-    sc = plt.scatter(x=df['longitude'], y=df['latitude'], c=df['avg_temp'], 
-                     cmap='coolwarm', alpha=0.5, s=10, edgecolor='none')
-    plt.colorbar(sc, label='Average Temperature (°C)')
+    # Hexbin draws one polygon per bin (mean temp per cell) regardless of N
+    hb = plt.hexbin(x=df_geo['longitude'], y=df_geo['latitude'], C=df_geo['avg_temp'],
+                    reduce_C_function=np.mean, gridsize=120, mincnt=1, cmap='coolwarm')
+    plt.colorbar(hb, label='Average Temperature (°C)')
     plt.title('Global Data Distribution (Colored by Avg Temp)', fontweight='bold', fontsize=16)
     plt.xlabel('Longitude')
     plt.ylabel('Latitude')
@@ -121,26 +99,111 @@ if 'latitude' in df.columns and 'longitude' in df.columns:
     plt.savefig(f"{output_dir}/geo_scatter_temp.png", dpi=300)
     plt.close()
 
+
 # E. Top Genres Horizontal Bar Chart
-if 'track_genre' in df.columns:
+def plot_top_genres(top_genres):
     print("Plotting top genres...")
     plt.figure(figsize=(12, 10))
-    top_genres = df['track_genre'].value_counts().iloc[:20]
-    sns.barplot(x=top_genres.values, y=top_genres.index, palette="mako")
+    sns.barplot(x=top_genres.values, y=top_genres.index.astype(str), palette="mako")
     plt.title('Top 20 Genres Frequency', fontweight='bold', fontsize=14)
     plt.xlabel('Number of Songs')
     plt.ylabel('Genre/Label')
     plt.savefig(f"{output_dir}/top_genres_bar.png", dpi=300)
     plt.close()
 
+
 # F. Audio Features Violin Plot by Continent (if available)
-if 'continent' in df.columns:
+def plot_violin(df_plot):
     print("Plotting violin plots by continent...")
     plt.figure(figsize=(14, 8))
     # Let's plot 'energy' distribution by continent
-    sns.violinplot(x='continent', y='energy', data=df, palette="Set2", split=True)
+    sns.violinplot(x='continent', y='energy', data=df_plot, palette="Set2", split=True)
     plt.title('Energy Distribution by Continent', fontweight='bold')
     plt.savefig(f"{output_dir}/violin_energy_continent.png", dpi=300)
     plt.close()
 
-print("Professional EDA Complete.")
+
+def main():
+    # Ensure output directory exists
+    os.makedirs(output_dir, exist_ok=True)
+
+    # 1. Load Data (Sample if large)
+    print("Loading data sample (1M rows)...")
+    try:
+        # Read a sample for visualization to manage memory
+        df = ds.dataset(input_file, format='parquet').head(1000000).to_pandas()
+        # Low-cardinality strings as categoricals (int codes for value_counts/groupby)
+        for col in ['region', 'continent', 'track_genre']:
+            if col in df.columns:
+                df[col] = df[col].astype('category').cat.remove_unused_categories()
+        print(f"Loaded {len(df)} rows.")
+    except Exception as e:
+        print(f"Error loading data: {e}")
+        sys.exit(1)
+
+    # 2. Statistical Summary
+    print("Generating comprehensive statistical summary...")
+    with open(report_file, 'w', encoding='utf-8') as f:
+        f.write("Professional EDA Report\n")
+        f.write("=======================\n\n")
+        f.write(f"Shape of sample: {df.shape}\n\n")
+
+        f.write("--- Data Types & Missing Values ---\n")
+        buffer = io.StringIO()
+        df.info(buf=buffer)
+        f.write(buffer.getvalue() + "\n\n")
+
+        f.write(f"Total Missing Values:\n{df.isnull().sum()}\n\n")
+
+        f.write("--- Numerical Statistics ---\n")
+        f.write(str(df.describe().T) + "\n\n")
+
+        f.write("--- Categorical Statistics ---\n")
+        f.write(str(df.describe(include=['O', 'category']).T) + "\n\n")
+
+        f.write("--- Top 20 Countries (by Data Volume) ---\n")
+        f.write(str(df['region'].value_counts().head(20)) + "\n\n")
+
+        f.write("--- Top 20 Genres ---\n")
+        f.write(str(df['track_genre'].value_counts().head(20)) + "\n\n")
+
+    print(f"Report saved to {report_file}")
+
+    # 3. Visualizations
+    print("Generating professional plots...")
+    df_plot = df.sample(n=min(plot_sample_size, len(df)), random_state=0)
+
+    # Feature list is known up front (float32 columns from Parquet included,
+    # no select_dtypes copy). With no missing values one BLAS-backed
+    # np.corrcoef suffices; otherwise .corr() keeps pairwise NaN handling
+    corr_cols = [c for c in audio_feats + socio_feats + geo_feats if c in df.columns]
+    corr_block = df[corr_cols]
+    if corr_block.notna().all().all():
+        corr_arr = corr_block.to_numpy(dtype=np.float64)
+        corr = pd.DataFrame(np.corrcoef(corr_arr, rowvar=False), index=corr_cols, columns=corr_cols)
+    else:
+        corr = corr_block.corr()
+
+    jobs = [
+        (plot_distributions, df_plot[audio_feats]),
+        (plot_boxplots, df_plot[audio_feats]),
+        (plot_correlation, corr),
+    ]
+    if 'latitude' in df.columns and 'longitude' in df.columns:
+        jobs.append((plot_geo, df[['longitude', 'latitude', 'avg_temp']]))
+    if 'track_genre' in df.columns:
+        jobs.append((plot_top_genres, df['track_genre'].value_counts().iloc[:20]))
+    if 'continent' in df.columns:
+        jobs.append((plot_violin, df_plot[['continent', 'energy']]))
+
+    # Figures are independent: render them in parallel processes
+    with ProcessPoolExecutor(max_workers=min(len(jobs), os.cpu_count() or 1)) as executor:
+        futures = [executor.submit(fn, data) for fn, data in jobs]
+        for future in futures:
+            future.result()
+
+    print("Professional EDA Complete.")
+
+
+if __name__ == '__main__':
+    main()
@@ -3,10 +3,10 @@
 Comprehensive preprocessing pipeline for the Weather & Music Genre prediction model.
 
 Pipeline Steps:
-  1. Load training data (chunked for memory efficiency)
+  1. Load training data (Parquet, first SAMPLE_SIZE rows only)
   2. Drop identifier columns (title, date, artist) — not predictive features
   3. Target Engineering — extract primary genre from list-string format
-  4. Categorical Encoding — LabelEncoder for 'region' and 'continent'
+  4. Categorical Encoding — pd.factorize (sorted codes) for 'region' and 'continent'
   5. Feature Scaling — StandardScaler on numerical features (fit on train only)
   6. Stratified Train/Test Split (80/20)
   7. Save processed splits as Parquet files for fast I/O
@@ -15,18 +15,18 @@ Pipeline Steps:
 Output Files:
   - data/X_train.parquet, data/X_test.parquet
   - data/y_train.parquet, data/y_test.parquet
-  - data/preprocessing_artifacts.pkl (encoders, scaler, feature names)
+  - data/preprocessing_artifacts.pkl (encoder classes, scaler, feature names)
   - data/preprocess_report.txt (summary statistics)
 """
 
 import pandas as pd
 import numpy as np
-import ast
+import pyarrow.dataset as ds
 import os
 import pickle
 import warnings
 from sklearn.model_selection import train_test_split, GroupShuffleSplit
-from sklearn.preprocessing import LabelEncoder, StandardScaler
+from sklearn.preprocessing import StandardScaler
 
 warnings.filterwarnings('ignore')
 
@@ -34,7 +34,7 @@ warnings.filterwarnings('ignore')
 # CONFIGURATION
 # ============================================================
 BASE_DIR = 'd:/Clase-fundamentos-aprendizaje-automatico/WeatherChart'
-INPUT_FILE = os.path.join(BASE_DIR, 'data', 'train_dataset.csv')
+INPUT_FILE = os.path.join(BASE_DIR, 'data', 'train_dataset.parquet')
 OUTPUT_DIR = os.path.join(BASE_DIR, 'data')
 
 # Columns to drop (identifiers, not predictive)
@@ -66,23 +66,20 @@ SAMPLE_SIZE = 2_000_000
 # ============================================================
 # HELPER FUNCTIONS
 # ============================================================
-def extract_primary_genre(genre_str):
+def extract_primary_genre(genres):
     """
-    Extract the first (primary) genre from a stringified list.
+    Extract the first (primary) genre from a Series of stringified lists.
+    Vectorized: a single regex pass over the column instead of parsing
+    every row with ast.literal_eval.
     
     Examples:
         "['pop', 'rock', 'dance']" -> 'pop'
         "['rock']"                 -> 'rock'
         "pop"                      -> 'pop'  (fallback for plain strings)
     """
-    try:
-        genre_list = ast.literal_eval(str(genre_str))
-        if isinstance(genre_list, list) and len(genre_list) > 0:
-            return genre_list[0]
-        return str(genre_str)
-    except (ValueError, SyntaxError):
-        # If it's already a plain string genre
-        return str(genre_str).strip()
+    primary = genres.str.extract(r"^\s*\[\s*(?P<q>['\"])(?P<genre>.*?)(?P=q)")['genre']
+    # If it's already a plain string genre
+    return primary.fillna(genres.astype(str).str.strip())
 
 
 def filter_rare_genres(df, target_col, min_samples=500):
@@ -94,11 +91,12 @@ def filter_rare_genres(df, target_col, min_samples=500):
         df_filtered: DataFrame with only sufficiently common genres
         removed_genres: list of genres that were removed
     """
-    genre_counts = df[target_col].value_counts()
-    valid_genres = genre_counts[genre_counts >= min_samples].index
-    removed_genres = genre_counts[genre_counts < min_samples].index.tolist()
+    # One grouping pass gives every row its genre's size (no value_counts + isin)
+    sizes = df.groupby(target_col)[target_col].transform('size')
+    mask = sizes >= min_samples
+    removed_genres = df.loc[~mask, target_col].unique().tolist()
     
-    df_filtered = df[df[target_col].isin(valid_genres)].copy()
+    df_filtered = df.loc[mask].copy()
     return df_filtered, removed_genres
 
 
@@ -126,13 +124,19 @@ def main():
         log(f"ERROR: {INPUT_FILE} not found. Run 11-create_training_set.py first.")
         return
     
+    dataset = ds.dataset(INPUT_FILE, format='parquet')
     if SAMPLE_SIZE:
-        df = pd.read_csv(INPUT_FILE, nrows=SAMPLE_SIZE)
+        df = dataset.head(SAMPLE_SIZE).to_pandas()
         log(f"  Loaded sample: {len(df):,} rows (of full dataset)")
     else:
-        df = pd.read_csv(INPUT_FILE)
+        df = dataset.to_table().to_pandas()
         log(f"  Loaded full dataset: {len(df):,} rows")
     
+    # region/continent/track_genre arrive dictionary-encoded (category);
+    # drop dictionary entries that are not present in the loaded sample
+    for col in df.select_dtypes(include='category').columns:
+        df[col] = df[col].cat.remove_unused_categories()
+    
     log(f"  Columns ({len(df.columns)}): {df.columns.tolist()}")
     log(f"  Memory usage: {df.memory_usage(deep=True).sum() / 1e6:.1f} MB")
     
@@ -151,7 +155,9 @@ def main():
     # ----------------------------------------------------------
     log("\n[STEP 3] Extracting primary genre from target column...")
     
-    df['primary_genre'] = df[TARGET_COL].apply(extract_primary_genre)
+    df['primary_genre'] = extract_primary_genre(df[TARGET_COL])
+    n_null_genres = df['primary_genre'].isna().sum()
+    assert n_null_genres == 0, f"{n_null_genres} rows with unparseable genre"
     df = df.drop(columns=[TARGET_COL])
     
     n_unique_genres = df['primary_genre'].nunique()
@@ -177,17 +183,28 @@ def main():
     
     for col in CATEGORICAL_COLS:
         if col in df.columns:
-            le = LabelEncoder()
-            df[col] = le.fit_transform(df[col].astype(str))
-            encoders[col] = le
-            log(f"  {col}: {len(le.classes_)} unique values -> LabelEncoded")
+            # pd.factorize gives the same sorted int codes as LabelEncoder in
+            # one C-level pass (on category codes when the column is categorical)
+            values = df[col]
+            if values.isna().any():
+                # Missing values become their own 'nan' class, as with
+                # LabelEncoder on astype(str) (newer pandas keeps NaN there)
+                values = values.astype(object).fillna('nan')
+            elif isinstance(values.dtype, pd.CategoricalDtype):
+                # sort=True follows category order, so make it lexical first
+                values = values.cat.reorder_categories(sorted(values.cat.categories))
+            codes, classes = pd.factorize(values, sort=True)
+            df[col] = codes.astype(np.int32)
+            encoders[col] = pd.Index(classes.astype(str))
+            log(f"  {col}: {len(classes)} unique values -> factorized")
     
     # Encode target
-    le_target = LabelEncoder()
-    df['primary_genre'] = le_target.fit_transform(df['primary_genre'])
-    encoders['primary_genre'] = le_target
-    log(f"  primary_genre: {len(le_target.classes_)} classes -> LabelEncoded")
-    log(f"  Genre mapping (first 10): {dict(zip(le_target.classes_[:10], range(10)))}")
+    codes, target_classes = pd.factorize(df['primary_genre'], sort=True)
+    df['primary_genre'] = codes.astype(np.int32)
+    target_classes = pd.Index(target_classes.astype(str))
+    encoders['primary_genre'] = target_classes
+    log(f"  primary_genre: {len(target_classes)} classes -> factorized")
+    log(f"  Genre mapping (first 10): {dict(zip(target_classes[:10], range(10)))}")
     
     # ----------------------------------------------------------
     # STEP 5: Train/Test Split — GROUP-BASED (prevent data leakage)
@@ -198,32 +215,31 @@ def main():
     log("  Fix: group by unique audio fingerprint so all copies of a song")
     log("  stay in the SAME set.")
     
-    # Separate features and target
-    X = df.drop(columns=['primary_genre'])
-    y = df['primary_genre']
-    
     # Create a unique song identity from audio features only
     # (these are the features that repeat across countries for the same song)
     audio_cols = [
         'danceability', 'energy', 'key', 'loudness', 'speechiness',
         'acousticness', 'instrumentalness', 'liveness', 'valence', 'tempo',
     ]
-    audio_cols_present = [c for c in audio_cols if c in X.columns]
-    song_group = pd.util.hash_pandas_object(X[audio_cols_present], index=False)
+    audio_cols_present = [c for c in audio_cols if c in df.columns]
+    song_group = pd.util.hash_pandas_object(df[audio_cols_present], index=False).to_numpy()
     
-    n_unique_songs = song_group.nunique()
+    n_unique_songs = len(pd.unique(song_group))
     log(f"  Unique songs (audio fingerprints): {n_unique_songs:,}")
-    log(f"  Total rows: {len(X):,}")
-    log(f"  Avg copies per song: {len(X)/n_unique_songs:.1f}")
+    log(f"  Total rows: {len(df):,}")
+    log(f"  Avg copies per song: {len(df)/n_unique_songs:.1f}")
     
-    # GroupShuffleSplit ensures all rows with the same song_group stay together
+    # GroupShuffleSplit ensures all rows with the same song_group stay together.
+    # Split on row indices only, then gather each side from df in a single
+    # pass (no intermediate full-size X copy from drop + iloc).
     gss = GroupShuffleSplit(n_splits=1, test_size=TEST_SIZE, random_state=RANDOM_STATE)
-    train_idx, test_idx = next(gss.split(X, y, groups=song_group))
+    train_idx, test_idx = next(gss.split(np.arange(len(df)), groups=song_group))
     
-    X_train = X.iloc[train_idx]
-    X_test = X.iloc[test_idx]
-    y_train = y.iloc[train_idx]
-    y_test = y.iloc[test_idx]
+    X_train = df.iloc[train_idx]
+    X_test = df.iloc[test_idx]
+    y_train = X_train.pop('primary_genre')
+    y_test = X_test.pop('primary_genre')
+    del df
     
     log(f"\n  X_train: {X_train.shape}")
     log(f"  X_test:  {X_test.shape}")
@@ -231,8 +247,9 @@ def main():
     log(f"  y_test:  {y_test.shape} (classes: {y_test.nunique()})")
     
     # VERIFY no leakage
-    train_hashes = set(pd.util.hash_pandas_object(X_train[audio_cols_present], index=False).values)
-    test_hashes = set(pd.util.hash_pandas_object(X_test[audio_cols_present], index=False).values)
+    # (reuse the fingerprints computed above instead of re-hashing each split)
+    train_hashes = set(song_group[train_idx])
+    test_hashes = set(song_group[test_idx])
     overlap = len(train_hashes & test_hashes)
     log(f"\n  === LEAKAGE VERIFICATION ===")
     log(f"  Unique songs in train: {len(train_hashes):,}")
@@ -257,9 +274,14 @@ def main():
     # Identify numerical columns that exist in the dataframe
     num_cols_present = [c for c in NUMERICAL_COLS if c in X_train.columns]
     
-    scaler = StandardScaler()
-    X_train[num_cols_present] = scaler.fit_transform(X_train[num_cols_present])
-    X_test[num_cols_present] = scaler.transform(X_test[num_cols_present])
+    # Pull each numerical block out once as float32 (halves bytes; int columns
+    # are downcast too) and scale it in place with copy=False
+    train_block = X_train[num_cols_present].to_numpy(dtype=np.float32)
+    test_block = X_test[num_cols_present].to_numpy(dtype=np.float32)
+    
+    scaler = StandardScaler(copy=False)
+    X_train[num_cols_present] = scaler.fit_transform(train_block)
+    X_test[num_cols_present] = scaler.transform(test_block)
     
     log(f"  Scaled {len(num_cols_present)} numerical features")
     log(f"  Features scaled: {num_cols_present}")
@@ -278,11 +300,12 @@ def main():
     # ----------------------------------------------------------
     log("\n[STEP 7] Saving processed data...")
     
-    # Save as Parquet (fast I/O, preserves dtypes)
-    X_train.to_parquet(os.path.join(OUTPUT_DIR, 'X_train.parquet'), index=False)
-    X_test.to_parquet(os.path.join(OUTPUT_DIR, 'X_test.parquet'), index=False)
-    y_train.to_frame().to_parquet(os.path.join(OUTPUT_DIR, 'y_train.parquet'), index=False)
-    y_test.to_frame().to_parquet(os.path.join(OUTPUT_DIR, 'y_test.parquet'), index=False)
+    # Save as Parquet (fast I/O, preserves dtypes). Numerical features are
+    # already float32 after scaling; zstd keeps the files small.
+    X_train.to_parquet(os.path.join(OUTPUT_DIR, 'X_train.parquet'), index=False, compression='zstd')
+    X_test.to_parquet(os.path.join(OUTPUT_DIR, 'X_test.parquet'), index=False, compression='zstd')
+    y_train.to_frame().to_parquet(os.path.join(OUTPUT_DIR, 'y_train.parquet'), index=False, compression='zstd')
+    y_test.to_frame().to_parquet(os.path.join(OUTPUT_DIR, 'y_test.parquet'), index=False, compression='zstd')
     
     log(f"  Saved X_train.parquet ({X_train.shape})")
     log(f"  Saved X_test.parquet ({X_test.shape})")
@@ -296,7 +319,7 @@ def main():
         'feature_names': list(X_train.columns),
         'numerical_cols': num_cols_present,
         'categorical_cols': CATEGORICAL_COLS,
-        'target_classes': list(le_target.classes_),
+        'target_classes': list(target_classes),
         'sample_size': SAMPLE_SIZE,
         'test_size': TEST_SIZE,
         'random_state': RANDOM_STATE,
@@ -304,7 +327,7 @@ def main():
     
     artifacts_path = os.path.join(OUTPUT_DIR, 'preprocessing_artifacts.pkl')
     with open(artifacts_path, 'wb') as f:
-        pickle.dump(artifacts, f)
+        pickle.dump(artifacts, f, protocol=pickle.HIGHEST_PROTOCOL)
     log(f"  Saved preprocessing_artifacts.pkl")
     
     # ----------------------------------------------------------
@@ -318,9 +341,9 @@ def main():
     log(f"  Training samples:  {len(X_train):>12,}")
     log(f"  Testing samples:   {len(X_test):>12,}")
     log(f"  Features:          {X_train.shape[1]:>12}")
-    log(f"  Target classes:    {len(le_target.classes_):>12}")
+    log(f"  Target classes:    {len(target_classes):>12}")
     log(f"  Scaling:           {'StandardScaler':>12}")
-    log(f"  Cat. Encoding:     {'LabelEncoder':>12}")
+    log(f"  Cat. Encoding:     {'factorize':>12}")
     log(f"  Split ratio:       {'80/20':>12}")
     log(f"  Stratified:        {'Yes':>12}")
     log("=" * 60)
@@ -245,12 +245,12 @@ def main():
     # ----------------------------------------------------------
     log("\n[PLOT 4] Accuracy by continent...")
 
-    le_continent = encoders.get('continent')
-    if le_continent is not None:
+    continent_classes = encoders.get('continent')
+    if continent_classes is not None:
         continent_encoded = X_test['continent'].values
-        continent_names = le_continent.inverse_transform(
+        continent_names = np.asarray(continent_classes)[
             continent_encoded.astype(int)
-        )
+        ]
 
         df_geo = pd.DataFrame({
             'continent': continent_names,
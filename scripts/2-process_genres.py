@@ -30,12 +30,17 @@ print("Exploding artists...")
 # Drop rows with null artists
 df = df.dropna(subset=['artists'])
 
-# Split and explode
-df['artist'] = df['artists'].str.split(';')
-df_exploded = df.explode('artist')
+# Split artists and repeat each track's values once per artist with a single
+# NumPy repeat (no DataFrame.explode of the full frame)
+parts = df['artists'].str.split(';')
+lengths = parts.str.len().to_numpy()
+flat_artists = np.concatenate(parts.to_numpy())
 
-# Clean artist names (strip whitespace)
-df_exploded['artist'] = df_exploded['artist'].str.strip()
+df_exploded = pd.DataFrame(df[numeric_cols].to_numpy().repeat(lengths, axis=0), columns=numeric_cols)
+df_exploded['track_genre'] = df['track_genre'].to_numpy().repeat(lengths)
+
+# Clean artist names (strip whitespace); categorical keys group on int codes
+df_exploded['artist'] = pd.Categorical(pd.Series(flat_artists).str.strip())
 
 print(f"Shape after explosion: {df_exploded.shape}")
 
@@ -52,7 +57,7 @@ for col in numeric_cols:
     agg_dict[col] = 'mean'
 
 # Group
-df_grouped = df_exploded.groupby('artist').agg(agg_dict).reset_index()
+df_grouped = df_exploded.groupby('artist', observed=True).agg(agg_dict).reset_index()
 
 # Rename columns for clarity if needed, but keeping them as is is fine.
 # track_genre -> genres (list)
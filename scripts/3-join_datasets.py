@@ -1,11 +1,18 @@
 import pandas as pd
+import pyarrow as pa
+import pyarrow.compute as pc
+import pyarrow.csv as pacsv
+import pyarrow.parquet as pq
 import os
-import re
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
 
 # File paths
 regions_file = 'd:/Clase-fundamentos-aprendizaje-automatico/WeatherChart/data/regions.csv'
 genres_file = 'd:/Clase-fundamentos-aprendizaje-automatico/WeatherChart/data/artist_genres.csv'
-output_file = 'd:/Clase-fundamentos-aprendizaje-automatico/WeatherChart/data/final_dataset.csv'
+output_file = 'd:/Clase-fundamentos-aprendizaje-automatico/WeatherChart/data/final_dataset.parquet'
+# Sidecar with the distinct regions, so 6/8 need not rescan final_dataset
+regions_unique_file = 'd:/Clase-fundamentos-aprendizaje-automatico/WeatherChart/data/regions_unique.parquet'
 
 # Check if input files exist
 if not os.path.exists(regions_file):
@@ -14,7 +21,10 @@ if not os.path.exists(genres_file):
     raise FileNotFoundError(f"{genres_file} not found.")
 
 print("Loading genres data...")
-df_genres = pd.read_csv(genres_file)
+# Explicit schema (artist_genres.csv from 2-process_genres.py): no dtype inference pass
+genre_numeric_cols = ['danceability', 'energy', 'key', 'loudness', 'speechiness', 'acousticness', 'instrumentalness', 'liveness', 'valence', 'tempo']
+genre_dtypes = {'artist': str, 'track_genre': str, **{col: 'float64' for col in genre_numeric_cols}}
+df_genres = pd.read_csv(genres_file, dtype=genre_dtypes)
 # Create a lookup dictionary: normalized artist name -> original artist name in genres file
 # We normalize by lowercasing and stripping whitespace
 df_genres['artist'] = df_genres['artist'].apply(str)
@@ -22,81 +32,154 @@ genre_artist_map = {name.lower().strip(): name for name in df_genres['artist']}
 print(f"Loaded {len(genre_artist_map)} unique artists from genres file.")
 
 print("Loading unique artists from regions file...")
-# Read only the 'artist' column to get unique artists efficiently
-unique_artists_series = pd.read_csv(regions_file, usecols=['artist'])['artist'].unique()
+# Multithreaded Arrow CSV reader: 64 MiB blocks parsed in parallel
+read_options = pacsv.ReadOptions(block_size=64 << 20, use_threads=True)
+# The string columns script 1 keeps are typed up front (per-block type
+# inference could disagree between blocks); empty strings are nulls, as with
+# pd.read_csv. artist/region are dictionary-encoded. Both passes over the
+# regions file share these, so they agree on which artists are null.
+regions_column_types = {
+    'title': pa.string(),
+    'date': pa.string(),
+    'artist': pa.dictionary(pa.int32(), pa.string()),
+    'region': pa.dictionary(pa.int32(), pa.string()),
+}
+
+# Read only the 'artist' column (dictionary-encoded) and fold each batch's
+# distinct non-null values into a set to get unique artists efficiently
+seen_artists = set()
+artist_reader = pacsv.open_csv(
+    regions_file,
+    read_options=read_options,
+    convert_options=pacsv.ConvertOptions(
+        include_columns=['artist'],
+        column_types=regions_column_types,
+        strings_can_be_null=True,
+    ),
+)
+has_null_artist = False
+for artist_batch in artist_reader:
+    artist_col = artist_batch.column('artist')
+    seen_artists.update(artist_col.dictionary.to_pylist())
+    has_null_artist = has_null_artist or artist_col.null_count > 0
+# Missing artists count as one unique (unmatched) value, as with pd.unique
+if has_null_artist:
+    seen_artists.add(None)
+unique_artists_series = pd.unique(pd.Series(list(seen_artists), dtype=object))
 print(f"Found {len(unique_artists_series)} unique artists in regions file.")
 
 # Smart Matching Logic
 print("Building artist mapping dictionary...")
-artist_mapping = {}
 
-# Regex for splitting: comma, semicolon, 'feat.', 'ft.', 'with', '&', 'vs.'
-split_pattern = re.compile(r'\s*(?:,|;| vs\.? | feat\.? | ft\.? |&| with )\s*', re.IGNORECASE)
+# Delimiters for splitting: comma, semicolon, 'feat.', 'ft.', 'with', '&', 'vs.'
+# (names are already lowercased; only the text before the first one is needed)
+split_delimiters = (',', ';', ' vs ', ' vs. ', ' feat ', ' feat. ', ' ft ', ' ft. ', '&', ' with ')
 
-matched_count = 0
-unmatched_count = 0
+def primary_artist_name(name):
+    """Return the text before the earliest delimiter (plain str.find scan, no regex)."""
+    cut = len(name)
+    for delim in split_delimiters:
+        pos = name.find(delim, 0, cut + len(delim) - 1)
+        if pos != -1:
+            cut = pos
+    return name[:cut].strip()
 
-for original_artist in unique_artists_series:
-    if not isinstance(original_artist, str):
-        artist_mapping[original_artist] = None
-        unmatched_count += 1
-        continue
-        
-    normalized_artist = original_artist.lower().strip()
-    
-    # Strategy 1: Exact Match
-    if normalized_artist in genre_artist_map:
-        artist_mapping[original_artist] = genre_artist_map[normalized_artist]
-        matched_count += 1
-        continue
-        
-    # Strategy 2: Smart Split & Match Primary Artist
-    parts = split_pattern.split(normalized_artist)
-    if parts:
-        primary_artist = parts[0].strip()
-        if primary_artist in genre_artist_map:
-            artist_mapping[original_artist] = genre_artist_map[primary_artist]
-            matched_count += 1
-            continue
-            
-    # No match found
-    artist_mapping[original_artist] = None
-    unmatched_count += 1
+# Vectorized over all unique artists (C-level .str passes, no per-artist Python loop)
+artists = pd.Series(unique_artists_series, dtype=object)
+# Non-string artists (NaN) stay unmatched
+normalized = artists.where(artists.notna()).astype('string').str.lower().str.strip()
+
+# Strategy 1: Exact Match
+exact = normalized.map(genre_artist_map)
+
+# Strategy 2: Smart Split & Match Primary Artist (only for the misses)
+misses = normalized[exact.isna() & normalized.notna()]
+primary_artist = misses.map(primary_artist_name)
+fallback = primary_artist.map(genre_artist_map)
+
+join_key = exact.fillna(fallback)
+matched_count = int(join_key.notna().sum())
+unmatched_count = len(artists) - matched_count
 
 print(f"Mapping complete. Matched: {matched_count} ({matched_count/len(unique_artists_series)*100:.2f}%) | Unmatched: {unmatched_count}")
 
-# Convert mapping to DataFrame for merge
-mapping_df = pd.DataFrame(list(artist_mapping.items()), columns=['artist', 'join_key'])
+# Resolve artist -> genre columns once (regions artist name kept as the key;
+# genre data comes from the matched artist): one indexed gather on the
+# matched names, no merge. reindex raises on duplicate genre artists instead
+# of silently fanning out rows.
+lookup_df = df_genres.set_index('artist').reindex(join_key.astype(object).to_numpy())
+lookup_df.index = pd.Index(artists, name='artist')
+
+# Arrow copy of the lookup: the join runs on Arrow batches (no pandas in the
+# chunk loop), probing each batch's artist dictionary once
+lookup_table = pa.Table.from_pandas(lookup_df.reset_index(), preserve_index=False)
+lookup_keys = lookup_table['artist'].cast(pa.string())
+lookup_cols = [c for c in lookup_table.column_names if c != 'artist']
 
 print("Processing regions file and joining...")
-# Read regions in chunks to manage memory
-chunk_size = 500000
-first_chunk = True
+# Read regions in blocks to manage memory
+convert_options = pacsv.ConvertOptions(
+    column_types=regions_column_types,
+    strings_can_be_null=True,
+)
+
+def join_batch(batch):
+    """Join one regions batch with the genre lookup."""
+    table = pa.Table.from_batches([batch])
+    # Probe the artist dictionary once, then gather every lookup column with
+    # the same indices (unmatched -> null)
+    artist = batch.column('artist')
+    idx = pc.index_in(artist.dictionary, value_set=lookup_keys).take(artist.indices)
+    for col in lookup_cols:
+        table = table.append_column(col, lookup_table[col].take(idx))
+    return table
+
+def joined_tables(batches, max_workers=max(1, (os.cpu_count() or 2) // 2)):
+    """Join batches on a thread pool, yielding the results in input order."""
+    # Window of max_workers + 1 batches: each one holds a decoded 64 MiB CSV
+    # block plus its joined genre columns, and the per-batch join is cheap
+    with ThreadPoolExecutor(max_workers=max_workers) as executor:
+        pending = deque()
+        for batch in batches:
+            pending.append(executor.submit(join_batch, batch))
+            if len(pending) > max_workers:
+                yield pending.popleft().result()
+        while pending:
+            yield pending.popleft().result()
+
+writer = None
+seen_regions = set()
+
+# Drop the previous run's sidecar first: if this run fails, 6/8 find no
+# sidecar instead of a stale region list
+if os.path.exists(regions_unique_file):
+    os.remove(regions_unique_file)
 
 try:
-    chunks = pd.read_csv(regions_file, chunksize=chunk_size)
+    batches = pacsv.open_csv(regions_file, read_options=read_options, convert_options=convert_options)
     
-    for i, chunk in enumerate(chunks):
-        # Merge chunk with mapping to get join_key
-        chunk_mapped = pd.merge(chunk, mapping_df, on='artist', how='left')
-        
-        # Merge with genres using join_key
-        # We drop the 'artist' from genres to avoid duplication, keeping the regions' artist name as primary reference
-        # but we use the genre data associated with the matched artist
-        chunk_final = pd.merge(chunk_mapped, df_genres, left_on='join_key', right_on='artist', how='left', suffixes=('', '_genre_source'))
-        
-        # Drop helper columns
-        chunk_final = chunk_final.drop(columns=['join_key', 'artist_genre_source'])
-        
-        # Append to output file
-        mode = 'w' if first_chunk else 'a'
-        header = first_chunk
-        chunk_final.to_csv(output_file, index=False, mode=mode, header=header)
-        first_chunk = False
+    for table in joined_tables(batches):
+        # Append to output file: one ParquetWriter for all chunks (binary
+        # columnar I/O, no per-chunk CSV re-encoding or file reopen)
+        if writer is None:
+            writer = pq.ParquetWriter(output_file, table.schema, compression='zstd', compression_level=3)
+        writer.write_table(table.cast(writer.schema))
+        # Distinct regions come for free from each batch's dictionary
+        for region_chunk in table.column('region').chunks:
+            seen_regions.update(region_chunk.dictionary.to_pylist())
         
         print(".", end="", flush=True)
 
+    # Close before writing the sidecar, so the sidecar is newer than final_dataset
+    if writer is not None:
+        writer.close()
     print(f"\nJoin complete. Saved to {output_file}")
 
+    pd.DataFrame({'region': sorted(r for r in seen_regions if r is not None)}).to_parquet(regions_unique_file, index=False)
+    print(f"Unique regions ({len(seen_regions)}) saved to {regions_unique_file}")
+
 except Exception as e:
     print(f"\nError processing regions file: {e}")
+finally:
+    if writer is not None:
+        writer.close()
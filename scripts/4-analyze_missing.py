@@ -1,8 +1,9 @@
 import pandas as pd
+import pyarrow.parquet as pq
 import os
 
 # File paths
-final_dataset = 'd:/Clase-fundamentos-aprendizaje-automatico/WeatherChart/data/final_dataset.csv'
+final_dataset = 'd:/Clase-fundamentos-aprendizaje-automatico/WeatherChart/data/final_dataset.parquet'
 genres_file = 'd:/Clase-fundamentos-aprendizaje-automatico/WeatherChart/data/artist_genres.csv'
 
 # Load unique artists from genres file for comparison
@@ -13,20 +14,22 @@ genre_artists = set(df_genres['artist'].astype(str).str.lower().str.strip())
 print("Analyzing final dataset for missing genres...")
 # Process in chunks because file is huge (4GB)
 chunk_size = 1000000
-missing_artists_counts = {}
+missing_count_parts = []
 
 try:
-    chunks = pd.read_csv(final_dataset, usecols=['artist', 'track_genre'], chunksize=chunk_size)
+    # Only the two needed columns are decoded from the Parquet file
+    batches = pq.ParquetFile(final_dataset).iter_batches(batch_size=chunk_size, columns=['artist', 'track_genre'])
     
-    for i, chunk in enumerate(chunks):
+    for i, batch in enumerate(batches):
+        chunk = batch.to_pandas()
         # Filter rows where genres is null
         missing = chunk[chunk['track_genre'].isna()]
         
         if not missing.empty:
-            # Count missing artists in this chunk
+            # Count missing artists in this chunk (merged once after the loop)
             counts = missing['artist'].value_counts()
-            for artist, count in counts.items():
-                missing_artists_counts[artist] = missing_artists_counts.get(artist, 0) + count
+            counts = counts[counts > 0]  # artist is categorical: skip unobserved categories
+            missing_count_parts.append(counts)
         
         print(".", end="", flush=True)
 
@@ -36,8 +39,13 @@ try:
     total_rows = 26173514 # Hardcoded from previous run knowledge or just omit
     # Actually, we can sum counts if we tracked total missing
     
-    # Convert to list and sort
-    missing_list = sorted(missing_artists_counts.items(), key=lambda x: x[1], reverse=True)
+    # Merge the per-chunk counts in one groupby, then convert to list and sort
+    if missing_count_parts:
+        missing_counts = pd.concat(missing_count_parts).groupby(level=0, observed=True).sum()
+        missing_counts = missing_counts[missing_counts > 0].sort_values(ascending=False, kind='stable')
+        missing_list = list(missing_counts.items())
+    else:
+        missing_list = []
     
     print(f"Total unique artists with missing genres: {len(missing_list)}")
     print("-" * 30)
@@ -1,20 +1,36 @@
 import pandas as pd
+import numpy as np
+import pyarrow as pa
+import pyarrow.compute as pc
+import pyarrow.parquet as pq
 import os
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
 
 # File paths
-main_dataset_file = 'd:/Clase-fundamentos-aprendizaje-automatico/WeatherChart/data/final_dataset.csv'
+main_dataset_file = 'd:/Clase-fundamentos-aprendizaje-automatico/WeatherChart/data/final_dataset.parquet'
 climate_file = 'd:/Clase-fundamentos-aprendizaje-automatico/WeatherChart/data/country_monthly_temps.csv'
-output_file = 'd:/Clase-fundamentos-aprendizaje-automatico/WeatherChart/data/final_dataset_v2.csv'
+output_file = 'd:/Clase-fundamentos-aprendizaje-automatico/WeatherChart/data/final_dataset_v2.parquet'
+# Distinct regions of final_dataset, written by 3-join_datasets.py
+regions_unique_file = 'd:/Clase-fundamentos-aprendizaje-automatico/WeatherChart/data/regions_unique.parquet'
 
 print("Loading datasets...")
 # Read climate data
-df_climate = pd.read_csv(climate_file)
+df_climate = pd.read_csv(climate_file, dtype={'country': str, 'month': 'int8', 'avg_temp': 'float64'})
 print(f"Climate data loaded: {df_climate.shape}")
 
 # Read main dataset (in chunks if huge, but we need to verify country names first)
 # For the join, let's load unique regions first to build a map, then chunk process.
 print("Loading unique regions from main dataset...")
-unique_regions = pd.read_csv(main_dataset_file, usecols=['region'])['region'].unique()
+# Read from the sidecar written alongside final_dataset (a few hundred
+# values) instead of scanning the main dataset
+# The sidecar must come from the same (successful) run of 3-join_datasets.py
+# as final_dataset; otherwise regions missing from it would join as unmatched
+if not os.path.exists(regions_unique_file):
+    raise FileNotFoundError(f"{regions_unique_file} not found. Re-run 3-join_datasets.py.")
+if os.path.getmtime(regions_unique_file) < os.path.getmtime(main_dataset_file):
+    raise RuntimeError(f"{regions_unique_file} is older than {main_dataset_file}. Re-run 3-join_datasets.py.")
+unique_regions = pd.read_parquet(regions_unique_file)['region'].to_numpy()
 print(f"Unique regions found: {len(unique_regions)}")
 
 # Normalization helper
@@ -39,20 +55,18 @@ region_join_map = {}
 matched_count = 0
 unmatched_list = []
 
+# Normalize the fixed overrides once instead of per region
+overrides_n2n = {normalize_name(k): normalize_name(v) for k, v in overrides.items()}
+
 for region in unique_regions:
     norm = normalize_name(region)
     
-    # Try overrides first
-    if norm in overrides and overrides[norm].lower() in climate_country_map:
-        region_join_map[region] = overrides[norm] # map to whatever key matches normalize(climate_country)
-        # Actually effectively we just need to match the 'country' column in climate df
-        # But climate_country_map keys are normalized.
-        # So: region_join_map[region] = climate_country_map[overrides[norm].lower()]
-        target = overrides[norm]
-        if normalize_name(target) in climate_country_map:
-             region_join_map[region] = climate_country_map[normalize_name(target)]
-             matched_count += 1
-             continue
+    # Try overrides first (map to the matching original climate country name)
+    target_norm = overrides_n2n.get(norm)
+    if target_norm is not None and target_norm in climate_country_map:
+        region_join_map[region] = climate_country_map[target_norm]
+        matched_count += 1
+        continue
 
     # Try exact normalized match
     if norm in climate_country_map:
@@ -70,37 +84,69 @@ print(f"Unmatched regions (Top 10): {unmatched_list[:10]}")
 # We rename 'country' to 'join_country' to matching
 df_climate = df_climate.rename(columns={'country': 'join_country'})
 
-# Create mapping dataframe
-mapping_df = pd.DataFrame(list(region_join_map.items()), columns=['region', 'join_country'])
+# Climate lookup as a dense [country, month] table (months 1-12 by column;
+# column 0 and the last row stay NaN for a missing month / unmatched region,
+# as with the left merge)
+climate_countries = pd.Index(df_climate['join_country'].unique())
+temp_table = np.full((len(climate_countries) + 1, 13), np.nan, dtype=np.float32)
+temp_table[climate_countries.get_indexer(df_climate['join_country']), df_climate['month'].to_numpy()] = df_climate['avg_temp'].to_numpy()
+
+# region -> climate country code (-1 = unmatched, i.e. the NaN row); the
+# trailing -1 also serves rows whose region is missing or unknown
+lookup_regions = list(region_join_map)
+lookup_keys = pa.array(lookup_regions, pa.string())
+region_country = climate_countries.get_indexer(pd.Index([region_join_map[r] for r in lookup_regions], dtype=object))
+region_country = np.append(region_country, -1)
 
 print("Joining climate data...")
 chunk_size = 500000
-first_chunk = True
+
+def join_batch(batch):
+    """Add month and avg_temp to one main-dataset batch."""
+    table = pa.Table.from_batches([batch])
+    
+    # 1. Extract month (ISO YYYY-MM-DD: slice the digits, no Timestamp parsing)
+    month = pc.cast(pc.utf8_slice_codeunits(batch.column('date'), 5, 7), pa.int8())
+    
+    # 2. Join with climate data on the region's country AND month: one
+    # integer-indexed gather into the [country, month] table
+    region = batch.column('region')
+    region_pos = pc.index_in(region.dictionary, value_set=lookup_keys).take(region.indices)
+    country_codes = region_country[region_pos.fill_null(-1).to_numpy()]
+    avg_temp = temp_table[country_codes, month.fill_null(0).to_numpy()]
+    table = table.append_column('month', month)
+    return table.append_column('avg_temp', pa.array(avg_temp, from_pandas=True))
+
+def joined_tables(batches, max_workers=max(1, (os.cpu_count() or 2) // 2)):
+    """Join batches on a thread pool, yielding the results in input order."""
+    # Window of max_workers + 1 batches: each one holds a 500k-row Parquet
+    # batch plus its month/avg_temp columns, and the per-batch join is cheap
+    with ThreadPoolExecutor(max_workers=max_workers) as executor:
+        pending = deque()
+        for batch in batches:
+            pending.append(executor.submit(join_batch, batch))
+            if len(pending) > max_workers:
+                yield pending.popleft().result()
+        while pending:
+            yield pending.popleft().result()
+
+writer = None
 
 try:
-    chunks = pd.read_csv(main_dataset_file, chunksize=chunk_size)
-    for chunk in chunks:
-        # 1. Add 'join_country' column
-        chunk = pd.merge(chunk, mapping_df, on='region', how='left')
-        
-        # 2. Extract month
-        chunk['date'] = pd.to_datetime(chunk['date'])
-        chunk['month'] = chunk['date'].dt.month
-        
-        # 3. Join with climate data on join_country AND month
-        chunk_merged = pd.merge(chunk, df_climate, on=['join_country', 'month'], how='left')
-        
-        # 4. Clean up
-        chunk_merged = chunk_merged.drop(columns=['join_country'])
-        
-        # Save
-        mode = 'w' if first_chunk else 'a'
-        header = first_chunk
-        chunk_merged.to_csv(output_file, index=False, mode=mode, header=header)
-        first_chunk = False
+    # Arrow batches end to end (no pandas in the chunk loop); region is read
+    # dictionary-encoded so each distinct region is probed once per batch
+    batches = pq.ParquetFile(main_dataset_file, read_dictionary=['region']).iter_batches(batch_size=chunk_size)
+    for table in joined_tables(batches):
+        # Save (single Parquet writer, schema fixed by the first batch)
+        if writer is None:
+            writer = pq.ParquetWriter(output_file, table.schema, compression='zstd', compression_level=3)
+        writer.write_table(table.cast(writer.schema))
         print(".", end="", flush=True)
 
     print(f"\nJoin complete. Saved to {output_file}")
     
 except Exception as e:
     print(f"Error joining climate data: {e}")
+finally:
+    if writer is not None:
+        writer.close()
@@ -1,7 +1,7 @@
 """
 8-join_economy.py
-Joins the main dataset (final_dataset_v2.csv) with socioeconomic data
-(country_economy.csv) to produce final_dataset_v3.csv.
+Joins the main dataset (final_dataset_v2.parquet) with socioeconomic data
+(country_economy.csv) to produce final_dataset_v3.parquet.
 
 Join strategy:
   - Normalize country names (lowercase, strip) for matching.
@@ -9,15 +9,23 @@ Join strategy:
   - Report matched/unmatched regions.
 """
 import pandas as pd
+import os
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+import pyarrow as pa
+import pyarrow.parquet as pq
 
 # File paths
-main_dataset_file = 'd:/Clase-fundamentos-aprendizaje-automatico/WeatherChart/data/final_dataset_v2.csv'
+main_dataset_file = 'd:/Clase-fundamentos-aprendizaje-automatico/WeatherChart/data/final_dataset_v2.parquet'
 economy_file = 'd:/Clase-fundamentos-aprendizaje-automatico/WeatherChart/data/country_economy.csv'
-output_file = 'd:/Clase-fundamentos-aprendizaje-automatico/WeatherChart/data/final_dataset_v3.csv'
+output_file = 'd:/Clase-fundamentos-aprendizaje-automatico/WeatherChart/data/final_dataset_v3.parquet'
+# Distinct regions of final_dataset, written by 3-join_datasets.py
+regions_unique_file = 'd:/Clase-fundamentos-aprendizaje-automatico/WeatherChart/data/regions_unique.parquet'
+final_dataset_file = 'd:/Clase-fundamentos-aprendizaje-automatico/WeatherChart/data/final_dataset.parquet'
 
 # --- Load economy data ---
 print("Loading economy data...")
-df_economy = pd.read_csv(economy_file)
+df_economy = pd.read_csv(economy_file, dtype={'country': str, 'continent': 'category', 'population': 'float64', 'gdp_per_capita': 'float64'})
 print(f"Economy data shape: {df_economy.shape}")
 
 # Normalization helper
@@ -28,9 +36,24 @@ def normalize_name(name):
 economy_country_map = {normalize_name(c): c for c in df_economy['country'].unique()}
 print(f"Unique economy countries: {len(economy_country_map)}")
 
+# Rename economy country column for join
+df_economy = df_economy.rename(columns={'country': 'join_country'})
+
+# Economy rows by country (~200 rows), as Arrow columns for the gather
+econ_lookup = df_economy.set_index('join_country')
+econ_table = pa.Table.from_pandas(econ_lookup, preserve_index=False)
+
 # --- Discover regions in main dataset ---
 print("Loading unique regions from main dataset...")
-unique_regions = pd.read_csv(main_dataset_file, usecols=['region'])['region'].unique()
+# Read from the sidecar written alongside final_dataset (a few hundred
+# values) instead of scanning the main dataset
+# The sidecar must come from the same (successful) run of 3-join_datasets.py
+# as final_dataset; otherwise regions missing from it would join as unmatched
+if not os.path.exists(regions_unique_file):
+    raise FileNotFoundError(f"{regions_unique_file} not found. Re-run 3-join_datasets.py.")
+if os.path.getmtime(regions_unique_file) < os.path.getmtime(final_dataset_file):
+    raise RuntimeError(f"{regions_unique_file} is older than {final_dataset_file}. Re-run 3-join_datasets.py.")
+unique_regions = pd.read_parquet(regions_unique_file)['region'].to_numpy()
 print(f"Unique regions: {len(unique_regions)}")
 
 # --- Build region -> economy_country mapping ---
@@ -51,37 +74,53 @@ print(f"Matched regions: {matched}/{len(unique_regions)}")
 if unmatched_list:
     print(f"Unmatched regions: {unmatched_list}")
 
-# --- Prepare mapping dataframe ---
-mapping_df = pd.DataFrame(list(region_map.items()), columns=['region', 'join_country'])
-
-# Rename economy country column for join
-df_economy = df_economy.rename(columns={'country': 'join_country'})
-
 # --- Process in chunks ---
 print("Joining economy data...")
 chunk_size = 500000
-first_chunk = True
+
+def join_batch(batch):
+    """Add the economy columns to one main-dataset batch."""
+    table = pa.Table.from_batches([batch])
+    # Economy row per distinct region, then broadcast to rows through the
+    # dictionary indices (unmatched or missing region -> null)
+    region = batch.column('region')
+    regions = region.dictionary.to_pylist()
+    dict_rows = econ_lookup.index.get_indexer(pd.Index([region_map.get(r) for r in regions], dtype=object))
+    rows = pa.array(dict_rows, mask=dict_rows < 0).take(region.indices)
+    for col in econ_table.column_names:
+        table = table.append_column(col, econ_table[col].take(rows))
+    return table
+
+def joined_tables(batches, max_workers=max(1, (os.cpu_count() or 2) // 2)):
+    """Join batches on a thread pool, yielding the results in input order."""
+    # Window of max_workers + 1 batches: each one holds a 500k-row Parquet
+    # batch plus its joined economy columns, and the per-batch join is cheap
+    with ThreadPoolExecutor(max_workers=max_workers) as executor:
+        pending = deque()
+        for batch in batches:
+            pending.append(executor.submit(join_batch, batch))
+            if len(pending) > max_workers:
+                yield pending.popleft().result()
+        while pending:
+            yield pending.popleft().result()
+
+writer = None
 
 try:
-    chunks = pd.read_csv(main_dataset_file, chunksize=chunk_size)
-    for chunk in chunks:
-        # Add join_country via mapping
-        chunk = pd.merge(chunk, mapping_df, on='region', how='left')
-        
-        # Join with economy data
-        chunk_merged = pd.merge(chunk, df_economy, on='join_country', how='left')
-        
-        # Drop join helper column
-        chunk_merged = chunk_merged.drop(columns=['join_country'])
-        
-        # Save
-        mode = 'w' if first_chunk else 'a'
-        header = first_chunk
-        chunk_merged.to_csv(output_file, index=False, mode=mode, header=header)
-        first_chunk = False
+    # Arrow batches end to end (no pandas in the chunk loop); region is read
+    # dictionary-encoded so each distinct region is looked up once per batch
+    batches = pq.ParquetFile(main_dataset_file, read_dictionary=['region']).iter_batches(batch_size=chunk_size)
+    for table in joined_tables(batches):
+        # Save (single Parquet writer, schema fixed by the first batch)
+        if writer is None:
+            writer = pq.ParquetWriter(output_file, table.schema, compression='zstd', compression_level=3)
+        writer.write_table(table.cast(writer.schema))
         print(".", end="", flush=True)
 
     print(f"\nJoin complete. Saved to {output_file}")
 
 except Exception as e:
     print(f"Error joining economy data: {e}")
+finally:
+    if writer is not None:
+        writer.close()
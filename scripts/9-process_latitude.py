@@ -84,20 +84,16 @@ WEST_HEMISPHERE = {
     'Venezuela'
 }
 
-# Apply sign corrections using normalized matching
-south_fixed = 0
-west_fixed = 0
-
-for idx, row in df_filtered.iterrows():
-    country = str(row['country']).strip()
-    
-    if country in SOUTH_HEMISPHERE and row['latitude'] > 0:
-        df_filtered.at[idx, 'latitude'] = -abs(row['latitude'])
-        south_fixed += 1
-    
-    if country in WEST_HEMISPHERE and row['longitude'] > 0:
-        df_filtered.at[idx, 'longitude'] = -abs(row['longitude'])
-        west_fixed += 1
+# Apply sign corrections using normalized matching (vectorized masks)
+country_s = df_filtered['country'].astype(str).str.strip()
+
+south_mask = country_s.isin(SOUTH_HEMISPHERE) & (df_filtered['latitude'] > 0)
+df_filtered.loc[south_mask, 'latitude'] = -df_filtered.loc[south_mask, 'latitude'].abs()
+south_fixed = int(south_mask.sum())
+
+west_mask = country_s.isin(WEST_HEMISPHERE) & (df_filtered['longitude'] > 0)
+df_filtered.loc[west_mask, 'longitude'] = -df_filtered.loc[west_mask, 'longitude'].abs()
+west_fixed = int(west_mask.sum())
 
 print(f"  Latitudes corrected to negative (South): {south_fixed}")
 print(f"  Longitudes corrected to negative (West): {west_fixed}")
@@ -151,7 +147,7 @@ hk_data = {
     'tertiary_enrollment': 84.8, # Proxy from Singapore
     'unemployment_rate': 4.11    # Proxy from Singapore
 }
-df_filtered = pd.concat([df_filtered, pd.DataFrame([hk_data])], ignore_index=True)
+df_filtered.loc[len(df_filtered)] = pd.Series(hk_data)  # in-place append, aligned by column name
 
 # Save
 print(f"\nSaving to {output_file}...")
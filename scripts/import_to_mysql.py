@@ -1,4 +1,5 @@
 import pandas as pd
+import pyarrow.parquet as pq
 from sqlalchemy import create_engine
 from tqdm import tqdm
 import os
@@ -13,7 +14,7 @@ DB_NAME = "weatherchart"
 TABLE_NAME = "train_dataset"
 
 # 2. File Configuration
-FILE_PATH = r"C:\ProgramData\MySQL\MySQL Server 8.0\Uploads\train_dataset.csv"
+FILE_PATH = r"d:\Clase-fundamentos-aprendizaje-automatico\WeatherChart\data\train_dataset.parquet"
 
 if not os.path.exists(FILE_PATH):
     print(f"Error: File not found at {FILE_PATH}")
@@ -33,7 +34,8 @@ except Exception as e:
 
 # 4. Import in Chunks
 CHUNK_SIZE = 50000  # Adjust based on memory
-TOTAL_ROWS = 18401182
+parquet_file = pq.ParquetFile(FILE_PATH)
+TOTAL_ROWS = parquet_file.metadata.num_rows
 
 print(f"Starting import of {TOTAL_ROWS:,} rows...")
 
@@ -44,7 +46,8 @@ first_chunk = True
 pbar = tqdm(total=TOTAL_ROWS, desc="Importing data", unit="rows")
 
 try:
-    for chunk in pd.read_csv(FILE_PATH, chunksize=CHUNK_SIZE):
+    for batch in parquet_file.iter_batches(batch_size=CHUNK_SIZE):
+        chunk = batch.to_pandas()
         # Convert date column to ensure SQL compatibility
         if 'date' in chunk.columns:
             chunk['date'] = pd.to_datetime(chunk['date'])